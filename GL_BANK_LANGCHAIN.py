@@ -1,83 +1,59 @@
 import streamlit as st
 import pandas as pd
-import re
+import io
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain_openai import ChatOpenAI
+from categorize import TEXT_DTYPE, GL_TEXT_COLS, categorize_gl, categorize_bank
 
-# -- Categorization logic from your script --
-def normalize_text(s):
-    if not isinstance(s, str):
-        return ''
-    s = s.upper()
-    s = re.sub(r'\s+', ' ', s)
-    return s.strip()
-
-def categorize_gl(row):
-    source = str(row.get('Source', '')).upper()
-    desc = str(row.get('Journal Line Description', '')).upper()
-    if '117' in desc:
-        return '117'
-    elif '153' in desc:
-        return '153'
-    elif '119' in desc:
-        return '119'
-    elif 'NC BANK' in desc:
-        return 'NC Bank'
-    elif 'AP' in source:
-        return 'AP'
-    elif 'H11' in source or 'TAX' in source:
-        return 'TAX'
-    else:
-        return 'UNMATCHED'
-
-def categorize_bank(row, col_text, col_type):
-    raw_text = row.get(col_text, '')
-    raw_type = row.get(col_type, '')
-    T = normalize_text(raw_text)
-    I = normalize_text(raw_type)
-
-    nc_keywords = ["INDN:SETT-BATCH", "3351637714", "CO ID:3351637714", "CCD"]
-    if all(k in T for k in nc_keywords):
-        return "NC Bank"
-
-    keywords_119 = [
-        "BNF:HERFF JONES LLC 4501 WEST 62ND STREET INDIANAPOLIS",
-        "BNF BK:PNC BANK NATIONAL",
-        "24295001305",
-        "HERFF JONES LLC OPERATING ACCOUNT 4501",
-        "JPMORGAN CHASE",
-        "SND BK:WELLS FARGO BANK",
-        "WELLS FARGO SWEEP",
-        "24354001505",
-        "JPMORGAN CHASE BANK"
-    ]
-    if any(k in T for k in keywords_119):
-        return "119"
-
-    if "TRSF" in T or "CUR" in T:
-        return "117"
-
-    if "BNF:LSC COMMUNICATIONS" in T:
-        return "153"
-
-    ap_words = ["CORP PMT", "VARSITY", "GOODS", "INV", "INTL OUT DATE:", "POP", "BALBOA", "VISION GEMS"]
-    if (I == "DETAIL DEBITS" and any(w in T for w in ap_words)) or \
-        (T.startswith("WIRE TYPE") and "INV" in T) or \
-        ("ACH DETAIL RETURN CO ID:5351637714 CCD" in T and I == "DETAIL CREDITS"):
-        return "AP"
-
-    if ("TAX " in T or "TAXPAY" in T) and I == "DETAIL DEBITS":
-        return "TAX"
-
-    return "UNMATCHED"
-
-def find_col(columns, key):
-    kl = key.replace(' ', '').lower()
+# Normalize each header once; find_col lookups then only do the substring test
+def column_index(columns):
+    index = {}
     for c in columns:
-        cl = str(c).replace(' ', '').lower()
-        if kl in cl:
-            return c
-    return None
+        index.setdefault(str(c).replace(' ', '').lower(), c)
+    return index
+
+def find_col(index, key):
+    kl = key.replace(' ', '').lower()
+    return next((c for cl, c in index.items() if kl in cl), None)
+
+@st.cache_data(show_spinner=False)
+def load_gl(file_bytes):
+    gl_df = pd.read_csv(io.BytesIO(file_bytes), dtype={c: TEXT_DTYPE for c in GL_TEXT_COLS})
+    gl_df["Remark"] = categorize_gl(gl_df, ["H11", "TAX"])
+    return gl_df
+
+@st.cache_data(show_spinner=False)
+def load_bank(file_bytes):
+    bank_df = pd.read_excel(io.BytesIO(file_bytes), header=5, engine="calamine")
+    index = column_index(bank_df.columns)
+    col_text = find_col(index, "Text")
+    col_type = find_col(index, "Data Type")
+    col_revsd_amt = find_col(index, "Revsd amt")
+    if col_text and col_type and col_revsd_amt:
+        bank_df["Remark"] = categorize_bank(bank_df, col_text, col_type)
+    # Stored as Arrow strings once categorization has seen the raw cell types
+    for c in (col_text, col_type):
+        if c:
+            bank_df[c] = bank_df[c].astype(TEXT_DTYPE)
+    return bank_df, col_text, col_type, col_revsd_amt
+
+# Keyed on the file bytes like the loaders: hashing the bytes is exact and much
+# cheaper than Streamlit re-hashing both processed frames on every rerun
+@st.cache_data(show_spinner=False)
+def build_summary(gl_bytes, bank_bytes):
+    gl_df = load_gl(gl_bytes)
+    bank_df, _, _, col_revsd_amt = load_bank(bank_bytes)
+    gl_sum = gl_df.groupby('Remark', observed=False)["Foreign Amount"].sum().rename("GL")
+    bank_sum = bank_df.groupby('Remark', observed=False)[col_revsd_amt].sum().rename("Bank Statement")
+    return pd.concat([gl_sum, bank_sum], axis=1).reset_index().rename(columns={"Remark":"Category"})
+
+def make_agent(openai_key, gl_df, bank_df):
+    return create_pandas_dataframe_agent(
+        ChatOpenAI(model="gpt-4o", temperature=0, openai_api_key=openai_key),
+        [gl_df, bank_df],
+        verbose=False,
+        allow_dangerous_code=True
+    )
 
 # --- Streamlit + LangChain App ---
 
@@ -89,22 +65,15 @@ gl_file = st.file_uploader("GL Details CSV", type=["csv"])
 bank_file = st.file_uploader("Bank Statement Excel (header row 6)", type=["xls", "xlsx"])
 
 if gl_file and bank_file:
-    gl_df = pd.read_csv(gl_file)
-    gl_df["Remark"] = gl_df.apply(categorize_gl, axis=1)
-
-    bank_df = pd.read_excel(bank_file, header=5)
-    col_text = find_col(bank_df.columns, "Text")
-    col_type = find_col(bank_df.columns, "Data Type")
-    col_revsd_amt = find_col(bank_df.columns, "Revsd amt")
+    # Parsing and categorization are cached on the file bytes, so reruns are cheap
+    gl_df = load_gl(gl_file.getvalue())
+    bank_df, col_text, col_type, col_revsd_amt = load_bank(bank_file.getvalue())
     if not col_text or not col_type or not col_revsd_amt:
         st.error(f"Bank file missing required columns! Found: {list(bank_df.columns)}")
         st.stop()
-    bank_df["Remark"] = bank_df.apply(lambda r: categorize_bank(r, col_text, col_type), axis=1)
 
     # Summaries for reference
-    gl_sum = gl_df.groupby('Remark')["Foreign Amount"].sum().rename("GL")
-    bank_sum = bank_df.groupby('Remark')[col_revsd_amt].sum().rename("Bank Statement")
-    summary_df = pd.concat([gl_sum, bank_sum], axis=1).fillna(0).reset_index().rename(columns={"Remark":"Category"})
+    summary_df = build_summary(gl_file.getvalue(), bank_file.getvalue())
 
     st.subheader("Category-wise Summary")
     st.dataframe(summary_df, use_container_width=True)
@@ -124,12 +93,14 @@ if gl_file and bank_file:
     if openai_key:
         # Minimal demo: Use both DataFrames as agent tools
         # You can merge/rename columns if needed, or pass as 2 separate frames.
-        agent = create_pandas_dataframe_agent(
-            ChatOpenAI(model="gpt-4o", temperature=0, openai_api_key=openai_key),
-            [gl_df, bank_df],
-            verbose=False,
-            allow_dangerous_code=True
-        )
+        # One agent per browser session, rebuilt only when an upload or the key changes.
+        # Its Python tool keeps df1/df2 between questions, so in-place edits made while
+        # answering one question are still there for the next one in this session.
+        agent_key = (gl_file.file_id, bank_file.file_id, openai_key)
+        if st.session_state.get("agent_key") != agent_key:
+            st.session_state.agent = make_agent(openai_key, gl_df, bank_df)
+            st.session_state.agent_key = agent_key
+        agent = st.session_state.agent
 
         user_query = st.text_area("Type your question (examples: 'Show all AP transactions', 'Total for NC Bank')", height=60)
         if st.button("Ask AI") and user_query.strip():
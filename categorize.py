@@ -0,0 +1,225 @@
+import pandas as pd
+import numpy as np
+import operator
+from functools import reduce
+import pyarrow as pa
+from collections import deque
+from numba import njit
+
+# --- Categorization Functions ---
+# Shared by gl_bank_agentic_model.py and GL_BANK_LANGCHAIN.py. As an imported module
+# it runs once per process, not on every Streamlit rerun, so the keyword tables are
+# built once and the Numba kernels cache under this module's name.
+
+NC_KEYWORDS = ["INDN:SETT-BATCH", "3351637714", "CO ID:3351637714", "CCD"]
+
+KEYWORDS_119 = [
+    "BNF:HERFF JONES LLC 4501 WEST 62ND STREET INDIANAPOLIS",
+    "BNF BK:PNC BANK NATIONAL",
+    "24295001305",
+    "HERFF JONES LLC OPERATING ACCOUNT 4501",
+    "JPMORGAN CHASE",
+    "SND BK:WELLS FARGO BANK",
+    "WELLS FARGO SWEEP",
+    "24354001505",
+    "JPMORGAN CHASE BANK"
+]
+
+AP_WORDS = ["CORP PMT", "VARSITY", "GOODS", "INV", "INTL OUT DATE:", "POP", "BALBOA", "VISION GEMS"]
+
+# Every bank keyword gets one bit; a single multi-pattern pass per text yields
+# the bitset of keywords it contains. "WIRE TYPE" only counts as a prefix.
+BANK_KEYWORDS = list(dict.fromkeys(
+    NC_KEYWORDS + KEYWORDS_119 + ["TRSF", "CUR", "BNF:LSC COMMUNICATIONS"] + AP_WORDS +
+    ["WIRE TYPE", "ACH DETAIL RETURN CO ID:5351637714 CCD", "TAX ", "TAXPAY"]
+))
+PREFIX_KEYWORDS = {"WIRE TYPE"}
+KEYWORD_BIT = {k: i for i, k in enumerate(BANK_KEYWORDS)}
+
+def keyword_mask(keywords):
+    return reduce(operator.or_, [1 << KEYWORD_BIT[k] for k in keywords])
+
+NC_MASK = keyword_mask(NC_KEYWORDS)
+K119_MASK = keyword_mask(KEYWORDS_119)
+K117_MASK = keyword_mask(["TRSF", "CUR"])
+LSC_MASK = keyword_mask(["BNF:LSC COMMUNICATIONS"])
+AP_MASK = keyword_mask(AP_WORDS)
+INV_MASK = keyword_mask(["INV"])
+WIRE_MASK = keyword_mask(["WIRE TYPE"])
+ACH_RETURN_MASK = keyword_mask(["ACH DETAIL RETURN CO ID:5351637714 CCD"])
+TAX_MASK = keyword_mask(["TAX ", "TAXPAY"])
+
+# Aho-Corasick over UTF-8 bytes, with the failure links folded into a dense
+# goto[state, byte] table so scanning is one table lookup per byte.
+# out_mask[state] holds the bits of every keyword ending in that state.
+def build_dfa(keywords):
+    goto = [np.full(256, -1, np.int32)]
+    out_mask = [0]
+    for k in keywords:
+        s = 0
+        for b in k.encode():
+            if goto[s][b] < 0:
+                goto[s][b] = len(goto)
+                goto.append(np.full(256, -1, np.int32))
+                out_mask.append(0)
+            s = goto[s][b]
+        out_mask[s] |= 1 << KEYWORD_BIT[k]
+    goto = np.array(goto)
+    out_mask = np.array(out_mask, np.int64)
+    fail = np.zeros(len(goto), np.int32)
+    queue = deque()
+    for b in range(256):
+        if goto[0, b] < 0:
+            goto[0, b] = 0
+        else:
+            queue.append(goto[0, b])
+    while queue:
+        r = queue.popleft()
+        out_mask[r] |= out_mask[fail[r]]
+        for b in range(256):
+            s = goto[r, b]
+            if s < 0:
+                goto[r, b] = goto[fail[r], b]
+            else:
+                fail[s] = goto[fail[r], b]
+                queue.append(s)
+    return goto, out_mask
+
+DFA_GOTO, DFA_OUT = build_dfa([k for k in BANK_KEYWORDS if k not in PREFIX_KEYWORDS])
+# Prefix-only keywords are checked with a byte compare at the start of each row
+PREFIX_BYTES = [np.frombuffer(k.encode(), np.uint8) for k in PREFIX_KEYWORDS]
+PREFIX_DATA = np.concatenate(PREFIX_BYTES)
+PREFIX_OFFSETS = np.cumsum([0] + [len(p) for p in PREFIX_BYTES]).astype(np.int64)
+PREFIX_MASKS = np.array([1 << KEYWORD_BIT[k] for k in PREFIX_KEYWORDS], np.int64)
+
+# Shared by GL and Bank so both Remark columns group onto the same index. The
+# categorizers emit these codes directly and wrap them with Categorical.from_codes.
+REMARK_DTYPE = pd.CategoricalDtype(categories=["117", "119", "153", "NC Bank", "AP", "TAX", "UNMATCHED"])
+R_117, R_119, R_153, R_NC_BANK, R_AP, R_TAX, R_UNMATCHED = range(7)
+OTHER_TYPE, DETAIL_DEBITS, DETAIL_CREDITS = 0, 1, 2
+
+@njit(cache=True)
+def decide_one(h, t):
+    if (h & NC_MASK) == NC_MASK:
+        return R_NC_BANK
+    if (h & K119_MASK) != 0:
+        return R_119
+    if (h & K117_MASK) != 0:
+        return R_117
+    if (h & LSC_MASK) != 0:
+        return R_153
+    if (t == DETAIL_DEBITS and (h & AP_MASK) != 0) or \
+       ((h & WIRE_MASK) != 0 and (h & INV_MASK) != 0) or \
+       ((h & ACH_RETURN_MASK) != 0 and t == DETAIL_CREDITS):
+        return R_AP
+    if (h & TAX_MASK) != 0 and t == DETAIL_DEBITS:
+        return R_TAX
+    return R_UNMATCHED
+
+# Scans the Arrow string buffers directly: no Python objects are touched per
+# row, and the keyword bits feed straight into decide_one. Kept serial: Streamlit
+# calls it from one thread per session, and Numba's fallback workqueue threading
+# layer aborts the process on concurrent parallel calls.
+@njit(cache=True)
+def scan_decide(offsets, data, goto, out_mask, prefix_data, prefix_offsets, prefix_masks, itype):
+    n = offsets.size - 1
+    out = np.zeros(n, np.uint8)
+    for i in range(n):
+        start, end = offsets[i], offsets[i + 1]
+        h = 0
+        s = 0
+        for j in range(start, end):
+            s = goto[s, data[j]]
+            h |= out_mask[s]
+        for p in range(prefix_masks.size):
+            p_start, p_end = prefix_offsets[p], prefix_offsets[p + 1]
+            if end - start >= p_end - p_start:
+                k = 0
+                while k < p_end - p_start and data[start + k] == prefix_data[p_start + k]:
+                    k += 1
+                if k == p_end - p_start:
+                    h |= prefix_masks[p]
+        out[i] = decide_one(h, itype[i])
+    return out
+
+def text_buffers(T):
+    arr = pa.array(T, type=pa.large_string())
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    _, offsets, data = arr.buffers()
+    offsets = np.frombuffer(offsets, np.int64)[arr.offset:arr.offset + len(arr) + 1]
+    data = np.frombuffer(data, np.uint8) if data is not None else np.zeros(0, np.uint8)
+    return offsets, data
+
+# Arrow-backed strings keep each text column in one contiguous UTF-8 buffer,
+# which is what the vectorized .str kernels scan
+TEXT_DTYPE = "string[pyarrow]"
+GL_TEXT_COLS = ["Source", "Journal Line Description"]
+
+# Arrow runs regexes with RE2, whose \s is ASCII only. This spells out everything
+# Python's \s (str.isspace) matches, so NBSP and other Unicode spaces still collapse.
+_WS_PATTERN = r'[\s\v\x1c-\x1f\x85\p{Z}]+'
+
+# Only str cells count as text: numbers and dates in an object column become NA,
+# so they normalize to '' as they did before the columns were typed
+def as_text(s):
+    if pd.api.types.is_object_dtype(s):
+        s = s.where(s.map(type) == str)
+    return s.astype(TEXT_DTYPE)
+
+def normalize_series(s):
+    # Non-string cells normalize to '' (the .str accessor yields NaN for them)
+    if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+        return pd.Series('', index=s.index)
+    # Passed as a string so Arrow's regex kernel runs it; a compiled re falls back to per-cell Python
+    s = as_text(s).str.upper().str.replace(_WS_PATTERN, ' ', regex=True).str.strip()  # compress whitespace
+    return s.fillna('')
+
+def text_col(df, col):
+    if col not in df.columns:
+        return pd.Series('', index=df.index, dtype=TEXT_DTYPE)
+    return df[col].astype(TEXT_DTYPE).fillna('')
+
+# Source / Data Type only hold a handful of distinct values: normalize each
+# value once and let callers broadcast per-value results back through the codes
+def factorize_upper(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df), np.intp), pd.Series([''], dtype=TEXT_DTYPE)
+    codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+    return codes, pd.Series(uniques).astype(TEXT_DTYPE).str.upper().fillna('')
+
+def encode_type(s):
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    I = normalize_series(pd.Series(uniques))
+    lookup = np.full(len(uniques), OTHER_TYPE, np.uint8)
+    lookup[(I == "DETAIL DEBITS").to_numpy(dtype=bool)] = DETAIL_DEBITS
+    lookup[(I == "DETAIL CREDITS").to_numpy(dtype=bool)] = DETAIL_CREDITS
+    return lookup[codes]
+
+def contains_any(s, keywords):
+    return reduce(operator.or_, [s.str.contains(k, regex=False) for k in keywords])
+
+# tax_sources: Source substrings that mark a TAX entry (the apps differ here)
+def categorize_gl(df, tax_sources):
+    src_codes, source = factorize_upper(df, 'Source')
+    desc = text_col(df, 'Journal Line Description')
+    # Digits are case-invariant, so only 'NC BANK' needs a case-insensitive
+    # scan and the description is never upper-cased as a whole
+    conditions = [
+        desc.str.contains('117', regex=False),
+        desc.str.contains('153', regex=False),
+        desc.str.contains('119', regex=False),
+        desc.str.contains('NC BANK', case=False, regex=False),
+        source.str.contains('AP', regex=False).to_numpy(dtype=bool)[src_codes],
+        contains_any(source, tax_sources).to_numpy(dtype=bool)[src_codes],
+    ]
+    conditions = [np.asarray(c, dtype=bool) for c in conditions]
+    codes = np.select(conditions, [R_117, R_153, R_119, R_NC_BANK, R_AP, R_TAX], default=R_UNMATCHED)
+    return pd.Categorical.from_codes(codes.astype(np.int8), dtype=REMARK_DTYPE)
+
+def categorize_bank(df, col_text, col_type):
+    T = normalize_series(df[col_text])
+    itype = encode_type(df[col_type])
+    offsets, data = text_buffers(T)
+    codes = scan_decide(offsets, data, DFA_GOTO, DFA_OUT, PREFIX_DATA, PREFIX_OFFSETS, PREFIX_MASKS, itype)
+    return pd.Categorical.from_codes(codes, dtype=REMARK_DTYPE)
@@ -1,77 +1,10 @@
 import streamlit as st
 import pandas as pd
-import re
-
-# --- Categorization Functions ---
-
-def normalize_text(s):
-    if not isinstance(s, str):
-        return ''
-    s = s.upper()
-    s = re.sub(r'\s+', ' ', s)  # compress whitespace
-    return s.strip()
-
-def categorize_gl(row):
-    source = str(row.get('Source', '')).upper()
-    desc   = str(row.get('Journal Line Description', '')).upper()
-    if '117' in desc:
-        return '117'
-    elif '153' in desc:
-        return '153'
-    elif '119' in desc:
-        return '119'
-    elif 'NC BANK' in desc:
-        return 'NC Bank'
-    elif 'AP' in source:
-        return 'AP'
-    elif 'H11' in source:
-        return 'TAX'
-    else:
-        return 'UNMATCHED'
-
-def categorize_bank(row, col_text, col_type):
-    raw_text = row.get(col_text, '')
-    raw_type = row.get(col_type, '')
-    T = normalize_text(raw_text)
-    I = normalize_text(raw_type)
-    
-    # NC Bank
-    nc_keywords = ["INDN:SETT-BATCH", "3351637714", "CO ID:3351637714", "CCD"]
-    if all(k in T for k in nc_keywords):
-        return "NC Bank"
-    
-    # 119
-    keywords_119 = [
-        "BNF:HERFF JONES LLC 4501 WEST 62ND STREET INDIANAPOLIS",
-        "BNF BK:PNC BANK NATIONAL",
-        "24295001305",
-        "HERFF JONES LLC OPERATING ACCOUNT 4501",
-        "JPMORGAN CHASE",
-        "SND BK:WELLS FARGO BANK",
-        "WELLS FARGO SWEEP",
-        "24354001505",
-        "JPMORGAN CHASE BANK"
-    ]
-    if any(k in T for k in keywords_119):
-        return "119"
-    
-    if "TRSF" in T or "CUR" in T:
-        return "117"
-    
-    if "BNF:LSC COMMUNICATIONS" in T:
-        return "153"
-    
-    ap_words = ["CORP PMT", "VARSITY", "GOODS", "INV", "INTL OUT DATE:", "POP", "BALBOA", "VISION GEMS"]
-    if (I == "DETAIL DEBITS" and any(w in T for w in ap_words)) or \
-       (T.startswith("WIRE TYPE") and "INV" in T) or \
-       ("ACH DETAIL RETURN CO ID:5351637714 CCD" in T and I == "DETAIL CREDITS"):
-        return "AP"
-    
-    if ("TAX " in T or "TAXPAY" in T) and I == "DETAIL DEBITS":
-        return "TAX"
-    
-    return "UNMATCHED"
+import io
+from categorize import REMARK_DTYPE, TEXT_DTYPE, GL_TEXT_COLS, categorize_gl, categorize_bank
 
+# Case-insensitive query -> category code, so filtering is an int compare on .cat.codes
+REMARK_CODE = {c.upper(): i for i, c in enumerate(REMARK_DTYPE.categories)}
 
 # --- Streamlit UI and Logic ---
 
@@ -89,37 +22,61 @@ uploaded_bank = st.file_uploader("Upload Bank Statement Excel (xls/xlsx)", type=
 gl_df = bank_df = None
 summary_df = None
 
-def find_col(columns, key):
-    kl = key.replace(' ', '').lower()
+# Normalize each header once; find_col lookups then only do the substring test
+def column_index(columns):
+    index = {}
     for c in columns:
-        cl = str(c).replace(' ', '').lower()
-        if kl in cl:
-            return c
-    return None
+        index.setdefault(str(c).replace(' ', '').lower(), c)
+    return index
 
-if uploaded_gl and uploaded_bank:
-    # Load GL
-    gl_df = pd.read_csv(uploaded_gl)
-    gl_df['Remark'] = gl_df.apply(categorize_gl, axis=1)
-    
-    # Load Bank with header at line 6 (0-based index 5)
-    bank_df = pd.read_excel(uploaded_bank, header=5)
+def find_col(index, key):
+    kl = key.replace(' ', '').lower()
+    return next((c for cl, c in index.items() if kl in cl), None)
+
+# Cached on the uploaded bytes so widget interactions don't re-parse and re-categorize
+@st.cache_data(show_spinner=False)
+def load_gl(file_bytes):
+    gl_df = pd.read_csv(io.BytesIO(file_bytes), dtype={c: TEXT_DTYPE for c in GL_TEXT_COLS})
+    gl_df['Remark'] = categorize_gl(gl_df, ['H11'])
+    return gl_df
+
+@st.cache_data(show_spinner=False)
+def load_bank(file_bytes):
+    # Bank header at line 6 (0-based index 5)
+    bank_df = pd.read_excel(io.BytesIO(file_bytes), header=5, engine='calamine')
     # Detect columns
-    col_text = find_col(bank_df.columns, 'Text')
-    col_type = find_col(bank_df.columns, 'Data Type')
-    col_revsd_amt = find_col(bank_df.columns, 'Revsd amt')
+    index = column_index(bank_df.columns)
+    col_text = find_col(index, 'Text')
+    col_type = find_col(index, 'Data Type')
+    col_revsd_amt = find_col(index, 'Revsd amt')
+    if col_text and col_type and col_revsd_amt:
+        bank_df['Remark'] = categorize_bank(bank_df, col_text, col_type)
+    # Stored as Arrow strings once categorization has seen the raw cell types
+    for c in (col_text, col_type):
+        if c:
+            bank_df[c] = bank_df[c].astype(TEXT_DTYPE)
+    return bank_df, col_text, col_type, col_revsd_amt
+
+# Keyed on the file bytes like the loaders: hashing the bytes is exact and much
+# cheaper than Streamlit re-hashing both processed frames on every rerun
+@st.cache_data(show_spinner=False)
+def build_summary(gl_bytes, bank_bytes):
+    gl_df = load_gl(gl_bytes)
+    bank_df, _, _, col_revsd_amt = load_bank(bank_bytes)
+    gl_sum = gl_df.groupby('Remark', observed=False)['Foreign Amount'].sum().rename('GL')
+    bank_sum = bank_df.groupby('Remark', observed=False)[col_revsd_amt].sum().rename('Bank Statement')
+    return pd.concat([gl_sum, bank_sum], axis=1).reset_index().rename(columns={'Remark':'Category'})
+
+if uploaded_gl and uploaded_bank:
+    gl_df = load_gl(uploaded_gl.getvalue())
+    bank_df, col_text, col_type, col_revsd_amt = load_bank(uploaded_bank.getvalue())
     
     if not col_text or not col_type or not col_revsd_amt:
         st.error(f"Could not detect needed columns in Bank file. Columns found: {list(bank_df.columns)}")
         st.stop()
     
-    bank_df['Remark'] = bank_df.apply(lambda r: categorize_bank(r, col_text, col_type), axis=1)
-    
     # Aggregate summary
-    gl_sum = gl_df.groupby('Remark')['Foreign Amount'].sum().rename('GL')
-    bank_sum = bank_df.groupby('Remark')[col_revsd_amt].sum().rename('Bank Statement')
-    
-    summary_df = pd.concat([gl_sum, bank_sum], axis=1).fillna(0).reset_index().rename(columns={'Remark':'Category'})
+    summary_df = build_summary(uploaded_gl.getvalue(), uploaded_bank.getvalue())
     
     st.success("Files processed and remarks assigned.")
     
@@ -145,9 +102,10 @@ if uploaded_gl and uploaded_bank:
         user_query = st.text_input("Enter remark/category to filter (case insensitive), e.g., AP, TAX, 117, 119")
         if user_query:
             uq = user_query.strip().upper()
+            code = REMARK_CODE.get(uq, -1)
             
-            gl_filtered = gl_df[gl_df['Remark'].str.upper() == uq]
-            bank_filtered = bank_df[bank_df['Remark'].str.upper() == uq]
+            gl_filtered = gl_df[gl_df['Remark'].cat.codes == code]
+            bank_filtered = bank_df[bank_df['Remark'].cat.codes == code]
             
             st.write(f"### GL Details matching remark '{user_query}'")
             if len(gl_filtered):